@@ -9,21 +9,33 @@ from PIL import Image, ImageDraw, ImageFont
 import io
 from bs4 import BeautifulSoup
 import requests
-import joblib
 from sklearn.preprocessing import StandardScaler
+from train_model import latest_model_version, load_artifacts
+from ranking import ranking_table, rankings_from_tables
+from snapshot import load_snapshot, rankings_from_snapshot
+from shared_cache import shared_cache, file_version
+from what_if import KKM, WhatIfIndex
 
 # [Fungsi-fungsi sebelumnya tetap sama]
-@st.cache_data
+# Cache dipakai bersama oleh semua proses Streamlit dan otomatis diperbarui
+# ketika file CSV berubah. Error saat membaca tidak di-cache karena exception
+# diteruskan ke load_data.
+@shared_cache(version=lambda: file_version("data_siswa.csv"))
+def read_data_siswa():
+    df = pd.read_csv("data_siswa.csv")
+    ada_duplikat = bool(df.duplicated(subset=["NIS"]).any())
+    return df.drop_duplicates(subset=["NIS"], keep="first"), ada_duplikat
+
 def load_data():
     try:
-        df = pd.read_csv("data_siswa.csv")
-        if df.duplicated(subset=["NIS"]).any():
-            st.warning("⚠️ Ada data duplikat berdasarkan NIS. Menghapus duplikat...")
-            df = df.drop_duplicates(subset=["NIS"], keep="first")
-        return df
+        df, ada_duplikat = read_data_siswa()
     except Exception as e:
         st.error(f"Error saat membaca file CSV: {e}")
         return pd.DataFrame()
+    # Peringatan ditampilkan di setiap rerun, bukan hanya saat cache kosong
+    if ada_duplikat:
+        st.warning("⚠️ Ada data duplikat berdasarkan NIS. Menghapus duplikat...")
+    return df
 
 def create_gauge_chart(value, title):
     fig = go.Figure(go.Indicator(
@@ -35,57 +47,49 @@ def create_gauge_chart(value, title):
             'axis': {'range': [None, 100]},
             'bar': {'color': "darkblue"},
             'steps': [
-                {'range': [0, 65], 'color': "red"},
-                {'range': [65, 85], 'color': "yellow"},
+                {'range': [0, KKM], 'color': "red"},
+                {'range': [KKM, 85], 'color': "yellow"},
                 {'range': [85, 100], 'color': "green"}
             ],
             'threshold': {
                 'line': {'color': "red", 'width': 4},
                 'thickness': 0.75,
-                'value': 65
+                'value': KKM
             }
         }
     ))
     return fig
 
-def get_status_ketuntasan(nilai, batas_minimal=5):
+def get_status_ketuntasan(nilai, batas_minimal=KKM):
     return "Tuntas" if nilai >= batas_minimal else "Belum Tuntas"
 
-# Fungsi baru untuk menghitung peringkat
-def calculate_rankings(df, biodata, subjects):
-    # Hitung total nilai untuk semua siswa
-    df['Total Nilai'] = df[subjects].mean(axis=1)
-    
-    # Hitung peringkat kelas
-    df_kelas = df[df['Kelas'] == biodata['Kelas']].copy()
-    df_kelas['Peringkat Kelas'] = df_kelas['Total Nilai'].rank(method='min', ascending=False).astype(int)
-    
-    # Hitung peringkat angkatan
-    angkatan = biodata['Kelas'][:-1]  # Misalnya 'IXA' -> 'IX'
-    df_angkatan = df[df['Kelas'].str.startswith(angkatan)].copy()
-    df_angkatan['Peringkat Angkatan'] = df_angkatan['Total Nilai'].rank(method='min', ascending=False).astype(int)
-    
-    # Ambil peringkat siswa
-    peringkat_kelas = df_kelas[df_kelas['NIS'] == biodata['NIS']]['Peringkat Kelas'].iloc[0]
-    peringkat_angkatan = df_angkatan[df_angkatan['NIS'] == biodata['NIS']]['Peringkat Angkatan'].iloc[0]
-    
-    total_kelas = len(df_kelas)
-    total_angkatan = len(df_angkatan)
-    
-    # Hitung persentil
-    persentil_kelas = ((total_kelas - peringkat_kelas + 1) / total_kelas) * 100
-    persentil_angkatan = ((total_angkatan - peringkat_angkatan + 1) / total_angkatan) * 100
-    
-    return {
-        'peringkat_kelas': peringkat_kelas,
-        'total_kelas': total_kelas,
-        'persentil_kelas': persentil_kelas,
-        'peringkat_angkatan': peringkat_angkatan,
-        'total_angkatan': total_angkatan,
-        'persentil_angkatan': persentil_angkatan,
-        'df_kelas': df_kelas,
-        'df_angkatan': df_angkatan
-    }
+# Tabel peringkat dan statistik disimpan di cache bersama sekali per kelas dan
+# angkatan, jadi tidak dihitung ulang di setiap rerun maupun di proses lain
+@shared_cache(version=lambda: file_version("data_siswa.csv"), depends_on=[ranking_table])
+def load_ranking_table(level, key, subjects):
+    df, _ = read_data_siswa()
+    return ranking_table(df, subjects, level, key)
+
+# Peringkat satu siswa dicari dari tabel kelas dan angkatannya
+def load_rankings(kelas, nis, subjects):
+    df_kelas = load_ranking_table('kelas', kelas, subjects)
+    df_angkatan = load_ranking_table('angkatan', kelas[:-1], subjects)
+    return rankings_from_tables(df_kelas, df_angkatan, nis)
+
+@shared_cache(version=lambda: file_version("data_siswa.csv"))
+def load_class_statistics(kelas, subjects):
+    df, _ = read_data_siswa()
+    return df[df['Kelas'] == kelas][subjects].agg(['mean', 'min', 'max', 'median', 'std'])
+
+# Indeks simulasi what-if: total nilai terurut per kelas dan angkatan.
+# Disimpan di memori proses (bukan cache bersama) supaya setiap gerakan slider
+# langsung memakai array yang sama tanpa membaca dan unpickle ulang.
+# Versi file dipakai sebagai kunci, jadi indeks dibangun ulang saat data berubah;
+# hanya indeks versi terbaru yang disimpan.
+@st.cache_resource(max_entries=1)
+def load_what_if_index(data_version, subjects):
+    df, _ = read_data_siswa()
+    return WhatIfIndex(df, list(subjects))
 
 # Fungsi untuk membuat visualisasi peringkat
 def create_ranking_visualization(peringkat, total, persentil, title):
@@ -147,6 +151,9 @@ def verify_login(nis, nama):
     return matched_siswa if not matched_siswa.empty else None
 
 # Fungsi untuk mengambil gambar logo dari halaman materi
+# Hasil scraping disimpan di cache bersama selama satu hari. Kegagalan (None)
+# tidak disimpan supaya gangguan jaringan sesaat tidak menyembunyikan logo.
+@shared_cache(ttl=24 * 60 * 60, cache_if=lambda logo: logo is not None)
 def get_platform_logo(url):
     try:
         response = requests.get(url, timeout=5)
@@ -192,12 +199,22 @@ def get_platform_logo(url):
     except Exception as e:
         return None
 
+# Muat model KNN dan scaler. Versi dipakai sebagai kunci cache, jadi begitu
+# train_model.py menulis versi baru, rerun berikutnya langsung memakainya
+# tanpa perlu restart aplikasi.
+# max_entries=1: versi model lama dilepas dari memori setelah retrain
+@st.cache_resource(max_entries=1)
+def load_model_artifacts(version):
+    return load_artifacts(version)
+
 # Load data materi belajar
-@st.cache_data
+@shared_cache(version=lambda: file_version("materi_belajar.csv"))
+def read_materi_data():
+    return pd.read_csv("materi_belajar.csv")  # Pastikan file CSV tersedia
+
 def load_materi_data():
     try:
-        df = pd.read_csv("materi_belajar.csv")  # Pastikan file CSV tersedia
-        return df
+        return read_materi_data()
     except Exception as e:
         st.error(f"Error saat membaca file CSV materi belajar: {e}")
         return pd.DataFrame()
@@ -226,8 +243,12 @@ else:
     subjects = ['PAB', 'B.Indonesia', 'B.Inggris', 'Informatika', 'IPA', 'IPS', 
                 'Matematika', 'Mulok', 'Pancasila', 'PJOK', 'Prakarya', 'Seni']
 
-    knn = joblib.load('model/knn_model.pkl')
-    scaler = joblib.load('model/scaler.pkl')
+    # Ambil payload dashboard siswa dari snapshot (satu kali baca per NIS).
+    # Jika snapshot belum dibuat, semua bagian dihitung langsung seperti biasa.
+    # Rekomendasi materi tetap dihitung langsung dengan model terbaru.
+    snapshot = load_snapshot(biodata['NIS'])
+
+    knn, scaler, model_features = load_model_artifacts(latest_model_version())
 
     # Fungsi untuk mendapatkan rekomendasi
     def get_recommendations(nis, df_siswa, df_materi, knn, scaler):
@@ -235,7 +256,7 @@ else:
         if siswa.empty:
             return []
 
-        siswa_scaled = scaler.transform(siswa.iloc[:, 3:])
+        siswa_scaled = scaler.transform(siswa[model_features])
         distances, indices = knn.kneighbors(siswa_scaled)
         recommended_materi = []
         for idx in indices[0]:
@@ -256,9 +277,12 @@ else:
             st.write("Tidak ada rekomendasi materi belajar.")
     
     # Hitung peringkat
-    rankings = calculate_rankings(df_siswa, biodata, subjects)
+    if snapshot:
+        rankings = rankings_from_snapshot(snapshot)
+    else:
+        rankings = load_rankings(biodata['Kelas'], biodata['NIS'], subjects)
     
-    tab1, tab2, tab3, tab4, tab5 = st.tabs(["📄 Biodata", "🏆 Peringkat", "📊 Progres Nilai", "📈 Perbandingan Nilai", "🎯 Personalized Learning Path"])
+    tab1, tab2, tab3, tab4, tab5, tab6 = st.tabs(["📄 Biodata", "🏆 Peringkat", "📊 Progres Nilai", "📈 Perbandingan Nilai", "🎯 Personalized Learning Path", "🔮 Simulasi Nilai"])
 
     # TAB BIODATA YANG DITINGKATKAN
     with tab1:
@@ -442,8 +466,8 @@ else:
             type='line',
             x0=-0.5,
             x1=len(filtered_nilai_df)-0.5,
-            y0=65,
-            y1=65,
+            y0=KKM,
+            y1=KKM,
             line=dict(
                 color='red',
                 width=2,
@@ -507,12 +531,19 @@ else:
                     st.error(f"Error saat membaca file CSV untuk mata pelajaran {subject}: {e}")
                     return pd.DataFrame()
             
-            subject_data = load_subject_data(selected_subject)
+            if snapshot:
+                # Detail nilai sudah difilter per siswa saat snapshot dibangun
+                subject_rows = snapshot['subject_details'].get(selected_subject)
+                ada_data = subject_rows is not None
+                subject_data_filtered = pd.DataFrame(subject_rows or [])
+            else:
+                subject_data = load_subject_data(selected_subject)
+                ada_data = not subject_data.empty
+                if ada_data:
+                    # Filter data hanya untuk siswa yang sedang login
+                    subject_data_filtered = subject_data[subject_data['nis'].astype(str) == str(biodata['NIS'])]
             
-            if not subject_data.empty:
-                # Filter data hanya untuk siswa yang sedang login
-                subject_data_filtered = subject_data[subject_data['nis'].astype(str) == str(biodata['NIS'])]
-                
+            if ada_data:
                 if not subject_data_filtered.empty:
                     st.subheader(f"Detail Nilai {selected_subject} untuk {biodata['Nama Siswa']}")
                     st.dataframe(subject_data_filtered, use_container_width=True, hide_index=True)
@@ -530,7 +561,10 @@ else:
         df_kelas = df_siswa[df_siswa['Kelas'] == kelas_siswa]
         
         # Hitung statistik kelas
-        stats_kelas = df_kelas[subjects].agg(['mean', 'min', 'max', 'median', 'std'])
+        if snapshot:
+            stats_kelas = pd.DataFrame(snapshot['stats_kelas'])[subjects]
+        else:
+            stats_kelas = load_class_statistics(kelas_siswa, subjects)
         
         # Buat DataFrame perbandingan
         compare_data = pd.DataFrame({
@@ -631,7 +665,7 @@ else:
         st.subheader("🔍 Analisis Kelemahan dan Kekuatan")
         
         # Tentukan batas nilai untuk kelemahan dan kekuatan
-        batas_kelemahan = 65
+        batas_kelemahan = KKM
         batas_kekuatan = 85
         
         kelemahan = [subject for subject in subjects if biodata[subject] < batas_kelemahan]
@@ -706,8 +740,7 @@ else:
         )
         
         # Identifikasi kelemahan (nilai di bawah KKM)
-        kkm = 65  # Batas KKM
-        weaknesses = [subject for subject in subjects if biodata[subject] < kkm]
+        weaknesses = [subject for subject in subjects if biodata[subject] < KKM]
         
         # Gabungkan preferensi & kelemahan
         prioritized_subjects = list(set(weaknesses + preferred_subjects))
@@ -721,6 +754,95 @@ else:
         else:
             st.warning("🚫 Tidak ada materi yang cocok dengan pencarian atau filter.")
         
+    # TAB SIMULASI NILAI (WHAT-IF)
+    with tab6:
+        st.subheader("🔮 Simulasi Nilai")
+        what_if = load_what_if_index(file_version("data_siswa.csv"), tuple(subjects))
+        
+        # Ubah nilai beberapa mata pelajaran dan lihat perkiraan hasilnya
+        simulated_subjects = st.multiselect(
+            "Pilih mata pelajaran yang ingin diubah:",
+            options=subjects,
+            default=[],
+            key="what_if_subjects"
+        )
+        changes = {}
+        for subject in simulated_subjects:
+            changes[subject] = st.slider(
+                f"Nilai {subject}",
+                min_value=0.0,
+                max_value=100.0,
+                value=float(biodata[subject]),
+                step=0.5,
+                key=f"what_if_{subject}"
+            )
+        
+        sekarang = what_if.simulate(biodata['NIS'], {})
+        simulasi = what_if.simulate(biodata['NIS'], changes)
+        
+        col1, col2, col3, col4 = st.columns(4)
+        
+        with col1:
+            st.metric(
+                "Total Nilai",
+                f"{simulasi['total_nilai']:.2f}",
+                f"{simulasi['total_nilai'] - sekarang['total_nilai']:+.2f}"
+            )
+        
+        with col2:
+            st.metric(
+                "Peringkat Kelas",
+                f"#{simulasi['peringkat_kelas']}",
+                f"{sekarang['peringkat_kelas'] - simulasi['peringkat_kelas']:+d} peringkat"
+            )
+            st.caption(f"Persentil {simulasi['persentil_kelas']:.1f}% dari {simulasi['total_kelas']} siswa")
+        
+        with col3:
+            st.metric(
+                "Peringkat Angkatan",
+                f"#{simulasi['peringkat_angkatan']}",
+                f"{sekarang['peringkat_angkatan'] - simulasi['peringkat_angkatan']:+d} peringkat"
+            )
+            st.caption(f"Persentil {simulasi['persentil_angkatan']:.1f}% dari {simulasi['total_angkatan']} siswa")
+        
+        with col4:
+            st.metric("Status", get_status_ketuntasan(simulasi['total_nilai']))
+        
+        if simulasi['belum_tuntas']:
+            st.warning(f"Mata pelajaran di bawah KKM: {', '.join(simulasi['belum_tuntas'])}")
+        
+        # Hitung nilai minimal untuk mencapai peringkat target
+        st.subheader("🎯 Nilai Minimal untuk Target Peringkat")
+        col1, col2, col3 = st.columns(3)
+        
+        with col1:
+            target_subject = st.selectbox("Mata pelajaran:", subjects, key="what_if_target_subject")
+        
+        with col2:
+            target_level = st.radio("Peringkat di:", ['kelas', 'angkatan'], horizontal=True, key="what_if_target_level")
+        
+        with col3:
+            target_rank = st.number_input(
+                "Target peringkat:",
+                min_value=1,
+                max_value=sekarang[f'total_{target_level}'],
+                value=1,
+                key="what_if_target_rank"
+            )
+        
+        nilai_minimal = what_if.minimum_grade(biodata['NIS'], target_subject, target_rank, target_level)
+        nilai_sekarang = biodata[target_subject]
+        
+        if nilai_minimal <= nilai_sekarang:
+            st.success(f"Peringkat {target_rank} di {target_level} sudah tercapai dengan nilai saat ini.")
+        elif nilai_minimal > 100:
+            st.error(f"Peringkat {target_rank} tidak bisa dicapai hanya dengan menaikkan nilai {target_subject}.")
+        else:
+            st.info(
+                f"Nilai {target_subject} minimal **{nilai_minimal:.2f}** "
+                f"(naik {nilai_minimal - nilai_sekarang:.2f} poin dari {nilai_sekarang:.2f})."
+            )
+
 
     # Tombol Logout
     if st.button("Logout"):
@@ -0,0 +1,51 @@
+# Tabel peringkat satu kelas (level 'kelas', key misalnya 'IXA') atau satu
+# angkatan (level 'angkatan', key misalnya 'IX'). Tabel ini sama untuk semua
+# siswa di kelompok tersebut, jadi bisa dihitung dan di-cache sekali saja.
+def ranking_table(df, subjects, level, key):
+    df = df.copy()
+    # Hitung total nilai untuk semua siswa
+    df['Total Nilai'] = df[subjects].mean(axis=1)
+
+    if level == 'kelas':
+        df_group = df[df['Kelas'] == key].copy()
+        df_group['Peringkat Kelas'] = df_group['Total Nilai'].rank(method='min', ascending=False).astype(int)
+    else:
+        df_group = df[df['Kelas'].str.startswith(key)].copy()
+        df_group['Peringkat Angkatan'] = df_group['Total Nilai'].rank(method='min', ascending=False).astype(int)
+    return df_group
+
+
+# Ambil peringkat dan persentil satu siswa dari tabel kelas dan angkatannya
+def rankings_from_tables(df_kelas, df_angkatan, nis):
+    peringkat_kelas = df_kelas[df_kelas['NIS'] == nis]['Peringkat Kelas'].iloc[0]
+    peringkat_angkatan = df_angkatan[df_angkatan['NIS'] == nis]['Peringkat Angkatan'].iloc[0]
+
+    total_kelas = len(df_kelas)
+    total_angkatan = len(df_angkatan)
+
+    # Hitung persentil
+    persentil_kelas = ((total_kelas - peringkat_kelas + 1) / total_kelas) * 100
+    persentil_angkatan = ((total_angkatan - peringkat_angkatan + 1) / total_angkatan) * 100
+
+    return {
+        'peringkat_kelas': peringkat_kelas,
+        'total_kelas': total_kelas,
+        'persentil_kelas': persentil_kelas,
+        'peringkat_angkatan': peringkat_angkatan,
+        'total_angkatan': total_angkatan,
+        'persentil_angkatan': persentil_angkatan,
+        'df_kelas': df_kelas,
+        'df_angkatan': df_angkatan
+    }
+
+
+# Hitung peringkat kelas dan angkatan satu siswa (dipindah dari index.py supaya
+# bisa dipakai ulang oleh snapshot, cache dan test)
+def calculate_rankings(df, biodata, subjects):
+    # Hitung total nilai untuk semua siswa
+    df['Total Nilai'] = df[subjects].mean(axis=1)
+
+    df_kelas = ranking_table(df, subjects, 'kelas', biodata['Kelas'])
+    angkatan = biodata['Kelas'][:-1]  # Misalnya 'IXA' -> 'IX'
+    df_angkatan = ranking_table(df, subjects, 'angkatan', angkatan)
+    return rankings_from_tables(df_kelas, df_angkatan, biodata['NIS'])
@@ -0,0 +1,200 @@
+import functools
+import hashlib
+import os
+import pickle
+import sqlite3
+import time
+
+# Cache disimpan di satu file SQLite yang bisa dibuka oleh semua proses
+# Streamlit di mesin yang sama. Path dan batas ukuran bisa diatur lewat env.
+CACHE_PATH = os.environ.get("SHARED_CACHE_PATH", os.path.join(".cache", "shared_cache.sqlite"))
+MAX_BYTES = int(os.environ.get("SHARED_CACHE_MAX_BYTES", 256 * 1024 * 1024))
+
+# Naikkan angka ini untuk membuang seluruh isi cache lama secara manual,
+# misalnya saat ada perubahan yang tidak terlihat dari kode fungsi yang di-cache
+CACHE_SCHEMA = 1
+
+# Waktu akses hanya diperbarui jika sudah lebih lama dari ini, supaya setiap
+# pembacaan tidak selalu menjadi penulisan
+TOUCH_INTERVAL = 60
+
+
+def _connect(path):
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    conn = sqlite3.connect(path, timeout=30)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute(
+        "CREATE TABLE IF NOT EXISTS cache ("
+        " key TEXT PRIMARY KEY,"
+        " namespace TEXT NOT NULL,"
+        " args_hash TEXT NOT NULL,"
+        " version TEXT NOT NULL,"
+        " value BLOB NOT NULL,"
+        " size INTEGER NOT NULL,"
+        " created_at REAL NOT NULL,"
+        " last_access REAL NOT NULL)"
+    )
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_cache_last_access ON cache (last_access)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_cache_entry ON cache (namespace, args_hash)")
+    return conn
+
+
+# Versi berdasarkan waktu modifikasi dan ukuran file, cukup satu stat per file.
+# File yang tidak ada tetap menghasilkan versi (supaya error tidak di-cache selamanya).
+def file_version(*paths):
+    parts = []
+    for path in paths:
+        try:
+            info = os.stat(path)
+            parts.append(f"{info.st_mtime_ns}-{info.st_size}")
+        except OSError:
+            parts.append("missing")
+    return "|".join(parts)
+
+
+# Sidik jari kode fungsi: bytecode, konstanta dan nama yang dipanggil. Code
+# object di dalam konstanta (lambda, comprehension) ikut dihitung secara rekursif
+# karena repr-nya berisi alamat memori yang berubah di setiap proses.
+def _code_fingerprint(code, sha):
+    sha.update(code.co_code)
+    sha.update(repr(code.co_names).encode())
+    for const in code.co_consts:
+        if hasattr(const, 'co_code'):
+            _code_fingerprint(const, sha)
+        else:
+            sha.update(repr(const).encode())
+
+
+# Bagian versi yang tetap selama proses berjalan: skema cache, protokol pickle,
+# versi pandas (nilai yang disimpan berupa DataFrame ter-pickle) dan kode fungsi
+def _static_version(funcs):
+    sha = hashlib.sha256()
+    sha.update(f"{CACHE_SCHEMA}:{pickle.HIGHEST_PROTOCOL}".encode())
+    try:
+        import pandas
+        sha.update(pandas.__version__.encode())
+    except ImportError:
+        pass
+    for func in funcs:
+        _code_fingerprint(func.__code__, sha)
+    return sha.hexdigest()[:16]
+
+
+def _args_hash(args, kwargs):
+    return hashlib.sha256(pickle.dumps((args, sorted(kwargs.items())))).hexdigest()
+
+
+class SharedCache:
+    def __init__(self, path=CACHE_PATH, max_bytes=MAX_BYTES):
+        self.path = path
+        self.max_bytes = max_bytes
+
+    # Mengembalikan (True, value) jika ada di cache, atau (False, None)
+    def get(self, namespace, args_hash, version, ttl=None):
+        key = f"{namespace}:{version}:{args_hash}"
+        conn = _connect(self.path)
+        try:
+            row = conn.execute(
+                "SELECT value, created_at, last_access FROM cache WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return False, None
+            value, created_at, last_access = row
+            now = time.time()
+            if ttl is not None and now - created_at > ttl:
+                return False, None
+            if now - last_access > TOUCH_INTERVAL:
+                with conn:
+                    conn.execute("UPDATE cache SET last_access = ? WHERE key = ?", (now, key))
+        finally:
+            conn.close()
+        return True, pickle.loads(value)
+
+    def set(self, namespace, args_hash, version, value):
+        key = f"{namespace}:{version}:{args_hash}"
+        data = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+        if len(data) > self.max_bytes:
+            return
+        now = time.time()
+        conn = _connect(self.path)
+        try:
+            # Satu transaksi: versi lama dari entri yang sama dibuang, entri baru
+            # ditulis, lalu entri paling lama tidak dipakai dihapus jika melebihi batas
+            with conn:
+                conn.execute(
+                    "DELETE FROM cache WHERE namespace = ? AND args_hash = ? AND version != ?",
+                    (namespace, args_hash, version)
+                )
+                conn.execute(
+                    "INSERT OR REPLACE INTO cache VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                    (key, namespace, args_hash, version, data, len(data), now, now)
+                )
+                self._evict(conn)
+        finally:
+            conn.close()
+
+    def _evict(self, conn):
+        total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM cache").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        to_delete = []
+        for key, size in conn.execute("SELECT key, size FROM cache ORDER BY last_access"):
+            if total <= self.max_bytes:
+                break
+            to_delete.append((key,))
+            total -= size
+        conn.executemany("DELETE FROM cache WHERE key = ?", to_delete)
+
+    def clear(self, namespace=None):
+        conn = _connect(self.path)
+        try:
+            with conn:
+                if namespace is None:
+                    conn.execute("DELETE FROM cache")
+                else:
+                    conn.execute("DELETE FROM cache WHERE namespace = ?", (namespace,))
+        finally:
+            conn.close()
+
+
+_default_cache = SharedCache()
+
+
+# Decorator untuk fungsi yang hasilnya dipakai bersama oleh semua proses.
+# `version` boleh berupa string atau fungsi tanpa argumen (misalnya
+# lambda: file_version("data_siswa.csv")) yang dievaluasi setiap pemanggilan.
+# Kode fungsi (dan fungsi di `depends_on`) ikut menjadi bagian versi, jadi
+# hasil dari kode lama tidak terpakai lagi setelah deploy.
+# `cache_if` menentukan hasil mana yang boleh disimpan, misalnya supaya hasil
+# gagal (None) tidak ikut di-cache. Exception dari fungsi tidak pernah di-cache.
+# Argumen fungsi harus bisa di-pickle karena dipakai sebagai bagian kunci.
+def shared_cache(namespace=None, version="1", ttl=None, cache_if=None, depends_on=(), cache=None):
+    def decorator(func):
+        ns = namespace or f"{func.__module__}.{func.__qualname__}"
+        static_version = _static_version([func, *depends_on])
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            store = cache or _default_cache
+            # Cache hanya mempercepat: jika file cache tidak bisa dibuat/dibaca
+            # atau isinya rusak, fungsi tetap dijalankan langsung
+            try:
+                data_version = version() if callable(version) else str(version)
+                current_version = f"{static_version}:{data_version}"
+                args_hash = _args_hash(args, kwargs)
+                found, value = store.get(ns, args_hash, current_version, ttl)
+            except Exception:
+                return func(*args, **kwargs)
+            if found:
+                return value
+            value = func(*args, **kwargs)
+            if cache_if is None or cache_if(value):
+                try:
+                    store.set(ns, args_hash, current_version, value)
+                except Exception:
+                    pass
+            return value
+
+        wrapper.clear = lambda: (cache or _default_cache).clear(ns)
+        return wrapper
+    return decorator
@@ -0,0 +1,254 @@
+import argparse
+import hashlib
+import io
+import json
+import os
+import secrets
+import sqlite3
+import time
+from datetime import datetime, timezone
+
+import pandas as pd
+
+from shared_cache import file_version
+from train_model import SUBJECTS
+
+DATA_PATH = "data_siswa.csv"
+MATA_PELAJARAN_DIR = "mata_pelajaran"
+SNAPSHOT_PATH = os.path.join("snapshot", "dashboard.sqlite")
+
+STATS = ['mean', 'min', 'max', 'median', 'std']
+
+# Tabel peringkat yang sudah di-parse, disimpan per proses berdasarkan versi
+# snapshot supaya tabel kelas/angkatan tidak di-parse ulang di setiap rerun
+_table_cache = {}
+
+
+# Mengembalikan data siswa beserta hash dari byte yang benar-benar di-parse
+def load_siswa(path=DATA_PATH):
+    with open(path, "rb") as f:
+        raw = f.read()
+    df = pd.read_csv(io.BytesIO(raw))
+    # Sama seperti load_data di index.py: buang duplikat berdasarkan NIS
+    df = df.drop_duplicates(subset=["NIS"], keep="first").reset_index(drop=True)
+    return df, hashlib.sha256(raw).hexdigest()
+
+
+def _subject_paths(subjects, directory=MATA_PELAJARAN_DIR):
+    return [os.path.join(directory, f"{subject}.csv") for subject in subjects]
+
+
+# Versi semua file sumber snapshot (data nilai dan detail per mata pelajaran).
+# Cukup satu stat per file, jadi murah dicek di setiap pembacaan.
+def source_version(data_path=DATA_PATH, subjects=SUBJECTS):
+    return file_version(data_path, *_subject_paths(subjects))
+
+
+# Detail nilai per mata pelajaran, dikelompokkan per NIS. Mata pelajaran yang
+# file CSV-nya tidak ada tidak dimasukkan sama sekali.
+def load_subject_details(subjects, directory=MATA_PELAJARAN_DIR):
+    details = {}
+    for subject, path in zip(subjects, _subject_paths(subjects, directory)):
+        if not os.path.isfile(path):
+            continue
+        df = pd.read_csv(path)
+        details[subject] = {
+            nis: group.to_dict(orient="records")
+            for nis, group in df.groupby(df['nis'].astype(str))
+        }
+    return details
+
+
+# Hitung peringkat kelas dan angkatan untuk semua siswa sekaligus, dengan
+# aturan yang sama seperti calculate_rankings di ranking.py. Tabel peringkat
+# dikembalikan sekali per kelas/angkatan dengan kunci 'kelas:IXA', 'angkatan:IX'.
+def build_rankings(df, subjects):
+    df = df.copy()
+    df['Total Nilai'] = df[subjects].mean(axis=1)
+    df['Peringkat Kelas'] = df.groupby('Kelas')['Total Nilai'].rank(method='min', ascending=False).astype(int)
+
+    tables = {}
+    for kelas, group in df.groupby('Kelas'):
+        tables[f"kelas:{kelas}"] = group[['Nama Siswa', 'Total Nilai', 'Peringkat Kelas']].to_dict(orient="records")
+
+    # Angkatan diambil dari nama kelas tanpa huruf terakhir, misalnya 'IXA' -> 'IX'
+    angkatan_rank = {}
+    for angkatan in df['Kelas'].str[:-1].unique():
+        df_angkatan = df[df['Kelas'].str.startswith(angkatan)].copy()
+        df_angkatan['Peringkat Angkatan'] = df_angkatan['Total Nilai'].rank(method='min', ascending=False).astype(int)
+        tables[f"angkatan:{angkatan}"] = df_angkatan[['Nama Siswa', 'Total Nilai', 'Peringkat Angkatan']].to_dict(orient="records")
+        angkatan_rank[angkatan] = dict(zip(df_angkatan['NIS'], df_angkatan['Peringkat Angkatan']))
+
+    return df, tables, angkatan_rank
+
+
+def build_payloads(df, subjects=SUBJECTS):
+    df, tables, angkatan_rank = build_rankings(df, subjects)
+
+    stats_kelas = {
+        kelas: group[subjects].agg(STATS).to_dict()
+        for kelas, group in df.groupby('Kelas')
+    }
+    subject_details = load_subject_details(subjects)
+
+    biodata_columns = [c for c in df.columns if c not in ('Total Nilai', 'Peringkat Kelas')]
+    payloads = {}
+    for i in range(len(df)):
+        record = df.iloc[i]
+        kelas = record['Kelas']
+        angkatan = kelas[:-1]
+        nis = record['NIS']
+
+        kelas_key = f"kelas:{kelas}"
+        angkatan_key = f"angkatan:{angkatan}"
+        total_kelas = len(tables[kelas_key])
+        total_angkatan = len(tables[angkatan_key])
+        peringkat_kelas = int(record['Peringkat Kelas'])
+        peringkat_angkatan = int(angkatan_rank[angkatan][nis])
+
+        payloads[str(nis)] = {
+            'biodata': record[biodata_columns].to_dict(),
+            'rankings': {
+                'peringkat_kelas': peringkat_kelas,
+                'total_kelas': total_kelas,
+                'persentil_kelas': ((total_kelas - peringkat_kelas + 1) / total_kelas) * 100,
+                'peringkat_angkatan': peringkat_angkatan,
+                'total_angkatan': total_angkatan,
+                'persentil_angkatan': ((total_angkatan - peringkat_angkatan + 1) / total_angkatan) * 100,
+            },
+            'kelas_key': kelas_key,
+            'angkatan_key': angkatan_key,
+            'stats_kelas': stats_kelas[kelas],
+            'subject_details': {
+                subject: rows.get(str(nis), [])
+                for subject, rows in subject_details.items()
+            },
+        }
+    return payloads, tables
+
+
+def _json_default(value):
+    # Nilai numpy (int64, float64) diubah ke tipe Python biasa
+    if hasattr(value, 'item'):
+        return value.item()
+    raise TypeError(f"Tipe {type(value).__name__} tidak bisa disimpan ke snapshot")
+
+
+def build_snapshot(data_path=DATA_PATH, snapshot_path=SNAPSHOT_PATH):
+    t_start = time.perf_counter()
+    # Versi sumber dicatat sebelum membaca data, jadi perubahan file selama
+    # build membuat snapshot langsung dianggap kedaluwarsa
+    data_version = source_version(data_path)
+    df, data_sha256 = load_siswa(data_path)
+    payloads, tables = build_payloads(df)
+
+    # Versi unik per build; dipakai juga sebagai kunci cache tabel peringkat
+    version = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%S%fZ") + "-" + secrets.token_hex(3)
+    meta = {
+        'version': version,
+        'built_at': datetime.now(timezone.utc).isoformat(),
+        'data_version': data_version,
+        'data_sha256': data_sha256,
+        'n_students': str(len(payloads)),
+    }
+
+    # Tulis ke file sementara lalu ganti sekaligus, supaya aplikasi yang
+    # sedang membaca tidak pernah melihat snapshot setengah jadi
+    os.makedirs(os.path.dirname(snapshot_path) or ".", exist_ok=True)
+    tmp_path = snapshot_path + ".tmp"
+    if os.path.exists(tmp_path):
+        os.remove(tmp_path)
+    conn = sqlite3.connect(tmp_path)
+    try:
+        conn.execute("CREATE TABLE meta (key TEXT PRIMARY KEY, value TEXT NOT NULL)")
+        conn.execute("CREATE TABLE dashboard (nis TEXT PRIMARY KEY, payload TEXT NOT NULL)")
+        conn.execute("CREATE TABLE ranking_tables (key TEXT PRIMARY KEY, payload TEXT NOT NULL)")
+        conn.executemany("INSERT INTO meta VALUES (?, ?)", meta.items())
+        conn.executemany(
+            "INSERT INTO dashboard VALUES (?, ?)",
+            ((nis, json.dumps(payload, default=_json_default)) for nis, payload in payloads.items())
+        )
+        conn.executemany(
+            "INSERT INTO ranking_tables VALUES (?, ?)",
+            ((key, json.dumps(rows, default=_json_default)) for key, rows in tables.items())
+        )
+        conn.commit()
+    finally:
+        conn.close()
+    os.replace(tmp_path, snapshot_path)
+
+    meta['build_seconds'] = time.perf_counter() - t_start
+    return meta
+
+
+def _connect_readonly(snapshot_path):
+    return sqlite3.connect(f"file:{snapshot_path}?mode=ro", uri=True)
+
+
+def _load_tables(conn, version, keys):
+    missing = [key for key in keys if (version, key) not in _table_cache]
+    if missing:
+        placeholders = ", ".join("?" for _ in missing)
+        rows = conn.execute(
+            f"SELECT key, payload FROM ranking_tables WHERE key IN ({placeholders})", missing
+        ).fetchall()
+        for key, payload in rows:
+            _table_cache[(version, key)] = pd.DataFrame(json.loads(payload))
+        # Tabel dari versi snapshot lama tidak dipakai lagi
+        for cached_version, key in list(_table_cache):
+            if cached_version != version:
+                del _table_cache[(cached_version, key)]
+    return [_table_cache.get((version, key)) for key in keys]
+
+
+# Ambil payload dashboard satu siswa berdasarkan NIS. Mengembalikan None jika
+# snapshot belum dibuat, NIS tidak ditemukan, atau snapshot sudah kedaluwarsa
+# (file data nilai atau detail mata pelajaran berubah sejak snapshot dibangun),
+# sehingga aplikasi kembali menghitung langsung dari data terbaru.
+def load_snapshot(nis, snapshot_path=SNAPSHOT_PATH, data_path=DATA_PATH):
+    if not os.path.isfile(snapshot_path):
+        return None
+    try:
+        conn = _connect_readonly(snapshot_path)
+        try:
+            meta = dict(conn.execute(
+                "SELECT key, value FROM meta WHERE key IN ('version', 'data_version')"
+            ).fetchall())
+            if meta.get('data_version') != source_version(data_path):
+                return None
+            row = conn.execute("SELECT payload FROM dashboard WHERE nis = ?", (str(nis),)).fetchone()
+            if row is None:
+                return None
+            payload = json.loads(row[0])
+            df_kelas, df_angkatan = _load_tables(
+                conn, meta['version'], [payload['kelas_key'], payload['angkatan_key']]
+            )
+        finally:
+            conn.close()
+    except sqlite3.Error:
+        return None
+    if df_kelas is None or df_angkatan is None:
+        return None
+    payload['rankings']['df_kelas'] = df_kelas
+    payload['rankings']['df_angkatan'] = df_angkatan
+    return payload
+
+
+# Bagian peringkat dari snapshot dalam bentuk yang sama dengan hasil calculate_rankings
+def rankings_from_snapshot(payload):
+    return dict(payload['rankings'])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Bangun snapshot dashboard per siswa ke SQLite.")
+    parser.add_argument("--data", default=DATA_PATH, help="Path file CSV nilai siswa")
+    parser.add_argument("--output", default=SNAPSHOT_PATH, help="Path file snapshot SQLite")
+    args = parser.parse_args()
+
+    meta = build_snapshot(args.data, args.output)
+    print(f"Snapshot versi {meta['version']} untuk {meta['n_students']} siswa disimpan di {args.output}")
+    print(f"Waktu build: {meta['build_seconds']:.2f} detik")
+
+
+if __name__ == "__main__":
+    main()
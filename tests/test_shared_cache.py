@@ -0,0 +1,209 @@
+import sqlite3
+import types
+
+import pytest
+
+import shared_cache
+from shared_cache import SharedCache
+
+
+# Jam palsu supaya urutan akses (LRU) dan TTL bisa diuji tanpa sleep
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(shared_cache, 'time', types.SimpleNamespace(time=lambda: now[0]))
+    return now
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return SharedCache(str(tmp_path / "cache.sqlite"))
+
+
+def rows(cache):
+    conn = sqlite3.connect(cache.path)
+    try:
+        return conn.execute("SELECT namespace, version FROM cache ORDER BY key").fetchall()
+    finally:
+        conn.close()
+
+
+def test_hit_miss_and_arguments(cache):
+    calls = []
+
+    @shared_cache.shared_cache(cache=cache)
+    def kali_dua(x):
+        calls.append(x)
+        return x * 2
+
+    assert kali_dua(2) == 4
+    assert kali_dua(2) == 4
+    assert kali_dua(3) == 6
+    assert calls == [2, 3]
+
+
+def test_new_version_recomputes_and_drops_old_entry(cache):
+    versi = ['1']
+    calls = []
+
+    @shared_cache.shared_cache(namespace='ns', version=lambda: versi[0], cache=cache)
+    def f(x):
+        calls.append(x)
+        return x
+
+    f(1)
+    versi[0] = '2'
+    f(1)
+    f(1)
+    assert calls == [1, 1]
+    assert len(rows(cache)) == 1
+    assert rows(cache)[0][1].endswith(':2')
+
+
+def test_code_change_invalidates_entries(cache):
+    @shared_cache.shared_cache(namespace='ns', cache=cache)
+    def f():
+        return 'lama'
+
+    assert f() == 'lama'
+
+    @shared_cache.shared_cache(namespace='ns', cache=cache)
+    def f():
+        return 'baru'
+
+    assert f() == 'baru'
+
+
+def test_dependency_code_change_invalidates_entries(cache):
+    def hitung_lama():
+        return 1
+
+    def hitung_baru():
+        return 2
+
+    def buat(dependency):
+        @shared_cache.shared_cache(namespace='ns', depends_on=[dependency], cache=cache)
+        def f():
+            calls.append(1)
+            return dependency()
+        return f
+
+    calls = []
+    assert buat(hitung_lama)() == 1
+    assert buat(hitung_lama)() == 1
+    assert buat(hitung_baru)() == 2
+    assert calls == [1, 1]
+
+
+def test_schema_bump_invalidates_entries(cache, monkeypatch):
+    def buat():
+        @shared_cache.shared_cache(namespace='ns', cache=cache)
+        def f():
+            calls.append(1)
+            return 1
+        return f
+
+    calls = []
+    buat()()
+    buat()()
+    assert calls == [1]
+    monkeypatch.setattr(shared_cache, 'CACHE_SCHEMA', shared_cache.CACHE_SCHEMA + 1)
+    buat()()
+    assert calls == [1, 1]
+
+
+def test_lru_eviction_by_size(tmp_path, clock, monkeypatch):
+    monkeypatch.setattr(shared_cache, 'TOUCH_INTERVAL', 0)
+    cache = SharedCache(str(tmp_path / "cache.sqlite"), max_bytes=2500)
+    value = 'x' * 1000
+    cache.set('ns', 'a', '1', value)
+    clock[0] += 1
+    cache.set('ns', 'b', '1', value)
+    clock[0] += 1
+    # 'a' dibaca lagi sehingga 'b' menjadi yang paling lama tidak dipakai
+    assert cache.get('ns', 'a', '1') == (True, value)
+    clock[0] += 1
+    cache.set('ns', 'c', '1', value)
+
+    assert cache.get('ns', 'a', '1')[0]
+    assert not cache.get('ns', 'b', '1')[0]
+    assert cache.get('ns', 'c', '1')[0]
+
+
+def test_value_larger_than_limit_is_not_stored(tmp_path):
+    cache = SharedCache(str(tmp_path / "cache.sqlite"), max_bytes=100)
+    cache.set('ns', 'a', '1', 'x' * 1000)
+    assert cache.get('ns', 'a', '1') == (False, None)
+
+
+def test_ttl_expiry(cache, clock):
+    calls = []
+
+    @shared_cache.shared_cache(ttl=60, cache=cache)
+    def f():
+        calls.append(1)
+        return 'logo'
+
+    f()
+    clock[0] += 30
+    f()
+    clock[0] += 31
+    f()
+    assert calls == [1, 1]
+
+
+def test_cache_if_skips_rejected_results(cache):
+    calls = []
+
+    @shared_cache.shared_cache(cache_if=lambda v: v is not None, cache=cache)
+    def f():
+        calls.append(1)
+        return None
+
+    f()
+    f()
+    assert calls == [1, 1]
+    assert rows(cache) == []
+
+
+def test_exceptions_are_not_cached(cache):
+    calls = []
+
+    @shared_cache.shared_cache(cache=cache)
+    def f():
+        calls.append(1)
+        raise ValueError("gagal")
+
+    for _ in range(2):
+        with pytest.raises(ValueError):
+            f()
+    assert calls == [1, 1]
+
+
+def test_unopenable_cache_path_falls_back_to_function(tmp_path):
+    bukan_folder = tmp_path / "file"
+    bukan_folder.write_text("")
+    cache = SharedCache(str(bukan_folder / "cache.sqlite"))
+
+    @shared_cache.shared_cache(cache=cache)
+    def f(x):
+        return x + 1
+
+    assert f(1) == 2
+
+
+def test_corrupt_blob_falls_back_to_function(cache):
+    calls = []
+
+    @shared_cache.shared_cache(cache=cache)
+    def f():
+        calls.append(1)
+        return 5
+
+    f()
+    conn = sqlite3.connect(cache.path)
+    with conn:
+        conn.execute("UPDATE cache SET value = x'00'")
+    conn.close()
+    assert f() == 5
+    assert calls == [1, 1]
@@ -0,0 +1,73 @@
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import snapshot
+from ranking import calculate_rankings
+from train_model import SUBJECTS
+
+COLUMNS = {
+    'df_kelas': ['Nama Siswa', 'Total Nilai', 'Peringkat Kelas'],
+    'df_angkatan': ['Nama Siswa', 'Total Nilai', 'Peringkat Angkatan'],
+}
+
+
+# Data kecil dengan nilai kembar, NIS duplikat dan kelas VII/VIII/IX
+@pytest.fixture
+def data_path(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    rng = np.random.default_rng(1)
+    n = 24
+    grades = rng.integers(120, 200, size=(n, len(SUBJECTS))) / 2
+    grades[1] = grades[0]
+    grades[5] = grades[4]
+    df = pd.DataFrame(grades, columns=SUBJECTS)
+    df.insert(0, 'Kelas', (['VIIA', 'VIIB', 'VIIIA', 'IXA'] * n)[:n])
+    df.insert(0, 'Nama Siswa', [f"Siswa {i}" for i in range(n)])
+    df.insert(0, 'NIS', range(5000, 5000 + n))
+    df = pd.concat([df, df.iloc[[2]]])
+    path = tmp_path / "data_siswa.csv"
+    df.to_csv(path)
+    return str(path)
+
+
+def test_snapshot_matches_calculate_rankings(data_path, tmp_path):
+    snapshot_path = str(tmp_path / "snapshot" / "dashboard.sqlite")
+    snapshot.build_snapshot(data_path, snapshot_path)
+    df, _ = snapshot.load_siswa(data_path)
+
+    for biodata in df.to_dict(orient="records"):
+        payload = snapshot.load_snapshot(biodata['NIS'], snapshot_path, data_path)
+        assert payload is not None
+        hasil = snapshot.rankings_from_snapshot(payload)
+        expected = calculate_rankings(df.copy(), biodata, SUBJECTS)
+
+        for key in ('peringkat_kelas', 'total_kelas', 'peringkat_angkatan', 'total_angkatan'):
+            assert hasil[key] == expected[key]
+        for key in ('persentil_kelas', 'persentil_angkatan'):
+            assert hasil[key] == pytest.approx(expected[key])
+        for key, columns in COLUMNS.items():
+            pd.testing.assert_frame_equal(
+                hasil[key][columns].reset_index(drop=True),
+                expected[key][columns].reset_index(drop=True),
+                check_dtype=False,
+            )
+
+
+def test_missing_nis_returns_none(data_path, tmp_path):
+    snapshot_path = str(tmp_path / "dashboard.sqlite")
+    snapshot.build_snapshot(data_path, snapshot_path)
+    assert snapshot.load_snapshot(1, snapshot_path, data_path) is None
+    assert snapshot.load_snapshot(5000, str(tmp_path / "tidak-ada.sqlite"), data_path) is None
+
+
+def test_snapshot_is_stale_after_data_changes(data_path, tmp_path):
+    snapshot_path = str(tmp_path / "dashboard.sqlite")
+    snapshot.build_snapshot(data_path, snapshot_path)
+    assert snapshot.load_snapshot(5000, snapshot_path, data_path) is not None
+
+    info = os.stat(data_path)
+    os.utime(data_path, ns=(info.st_atime_ns, info.st_mtime_ns + 1_000_000_000))
+    assert snapshot.load_snapshot(5000, snapshot_path, data_path) is None
@@ -0,0 +1,56 @@
+import json
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from train_model import SUBJECTS, hash_file, latest_model_version, load_artifacts, train
+
+
+@pytest.fixture
+def data_path(tmp_path):
+    rng = np.random.default_rng(0)
+    df = pd.DataFrame(rng.uniform(60, 100, size=(30, len(SUBJECTS))), columns=SUBJECTS)
+    df.insert(0, 'Kelas', ['VIIA', 'VIIB', 'VIIIA'] * 10)
+    df.insert(0, 'Nama Siswa', [f"Siswa {i}" for i in range(30)])
+    df.insert(0, 'NIS', range(1000, 1030))
+    path = tmp_path / "data_siswa.csv"
+    df.to_csv(path)
+    return str(path)
+
+
+def test_train_writes_manifest_and_round_trips(data_path, tmp_path):
+    versions_dir = str(tmp_path / "versions")
+    manifest = train(data_path, versions_dir, k_values=[3, 5, 7], metrics=['euclidean', 'manhattan'],
+                     n_splits=3, n_jobs=1)
+
+    assert latest_model_version(versions_dir) == manifest['version']
+    with open(os.path.join(versions_dir, manifest['version'], "manifest.json")) as f:
+        on_disk = json.load(f)
+    assert on_disk['features'] == SUBJECTS
+    assert on_disk['data_sha256'] == hash_file(data_path)
+    assert on_disk['n_samples'] == 30
+    assert len(on_disk['cv_results']) == 6
+    assert isinstance(on_disk['best_k_at_grid_edge'], bool)
+
+    knn, scaler, features = load_artifacts(manifest['version'], versions_dir)
+    assert features == SUBJECTS
+    assert knn.n_neighbors == manifest['n_neighbors']
+    assert knn.n_samples_fit_ == 30
+    X = pd.read_csv(data_path)[features]
+    _, indices = knn.kneighbors(scaler.transform(X.iloc[:2]))
+    assert indices.shape == (2, manifest['n_neighbors'])
+
+
+def test_latest_model_version_prefers_newest_and_ignores_tmp(data_path, tmp_path):
+    versions_dir = str(tmp_path / "versions")
+    first = train(data_path, versions_dir, k_values=[3], metrics=['euclidean'], n_splits=3, n_jobs=1)
+    second = train(data_path, versions_dir, k_values=[3], metrics=['euclidean'], n_splits=3, n_jobs=1)
+    assert first['version'] != second['version']
+    os.makedirs(os.path.join(versions_dir, "99999999T999999999999Z-zzzzzz.tmp"))
+    assert latest_model_version(versions_dir) == second['version']
+
+
+def test_latest_model_version_without_versions(tmp_path):
+    assert latest_model_version(str(tmp_path / "tidak-ada")) is None
@@ -0,0 +1,95 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from what_if import WhatIfIndex
+
+SUBJECTS = ['IPA', 'IPS', 'Matematika']
+
+
+# Data kecil dengan nilai kembar (total sama) dan kelas VII/VIII, supaya aturan
+# startswith angkatan ('VII' juga mencakup 'VIII') ikut teruji
+@pytest.fixture
+def df():
+    rows = [
+        (1, 'A', 'VIIA', 80, 80, 80),
+        (2, 'B', 'VIIA', 80, 80, 80),
+        (3, 'C', 'VIIA', 90, 70, 80),
+        (4, 'D', 'VIIA', 70, 70, 70),
+        (5, 'E', 'VIIA', 95, 90, 85),
+        (6, 'F', 'VIIB', 85, 80, 75),
+        (7, 'G', 'VIIB', 60, 65, 70),
+        (8, 'H', 'VIIIA', 90, 90, 90),
+        (9, 'I', 'VIIIA', 80, 80, 80),
+        (10, 'J', 'VIIIB', 75, 80, 85),
+    ]
+    df = pd.DataFrame(rows, columns=['NIS', 'Nama Siswa', 'Kelas'] + SUBJECTS)
+    return df.astype({subject: float for subject in SUBJECTS})
+
+
+# Peringkat seperti calculate_rankings di ranking.py, dihitung ulang penuh
+def brute_rank(df, nis, changes, level):
+    df = df.copy()
+    row = df['NIS'] == nis
+    for subject, nilai in changes.items():
+        df.loc[row, subject] = nilai
+    df['Total Nilai'] = df[SUBJECTS].mean(axis=1)
+    kelas = df.loc[row, 'Kelas'].iloc[0]
+    if level == 'kelas':
+        group = df[df['Kelas'] == kelas]
+    else:
+        group = df[df['Kelas'].str.startswith(kelas[:-1])]
+    ranks = group['Total Nilai'].rank(method='min', ascending=False).astype(int)
+    return int(ranks[group['NIS'] == nis].iloc[0]), len(group)
+
+
+@pytest.mark.parametrize('changes', [{}, {'IPA': 100}, {'IPA': 0}, {'IPS': 80, 'Matematika': 80}])
+@pytest.mark.parametrize('level', ['kelas', 'angkatan'])
+def test_simulate_matches_brute_force(df, changes, level):
+    index = WhatIfIndex(df, SUBJECTS)
+    for nis in df['NIS']:
+        hasil = index.simulate(nis, changes)
+        peringkat, jumlah = brute_rank(df, nis, changes, level)
+        assert hasil[f'peringkat_{level}'] == peringkat
+        assert hasil[f'total_{level}'] == jumlah
+
+
+def test_simulate_tie_with_own_old_score_not_counted(df):
+    index = WhatIfIndex(df, SUBJECTS)
+    # Siswa 1 dan 2 sama-sama total 80: keduanya peringkat yang sama
+    assert index.simulate(1, {})['peringkat_kelas'] == index.simulate(2, {})['peringkat_kelas']
+    # Turun sedikit: hanya siswa 2 (80) dan yang lebih tinggi yang di atasnya
+    assert index.simulate(1, {'IPA': 79})['peringkat_kelas'] == brute_rank(df, 1, {'IPA': 79}, 'kelas')[0]
+
+
+@pytest.mark.parametrize('level', ['kelas', 'angkatan'])
+@pytest.mark.parametrize('subject', SUBJECTS)
+def test_minimum_grade_is_tight(df, level, subject):
+    index = WhatIfIndex(df, SUBJECTS)
+    for nis in df['NIS']:
+        jumlah = brute_rank(df, nis, {}, level)[1]
+        for target in range(1, jumlah + 2):
+            needed = index.minimum_grade(nis, subject, target, level)
+            assert brute_rank(df, nis, {subject: needed}, level)[0] <= target
+            if needed > 0:
+                # Sedikit di bawah nilai minimal, target tidak lagi tercapai
+                assert brute_rank(df, nis, {subject: needed - 0.02}, level)[0] > target
+
+
+@pytest.mark.parametrize('level', ['kelas', 'angkatan'])
+def test_target_rank_at_or_beyond_group_size_needs_nothing(df, level):
+    index = WhatIfIndex(df, SUBJECTS)
+    for nis in df['NIS']:
+        jumlah = brute_rank(df, nis, {}, level)[1]
+        for target in (jumlah, jumlah + 5):
+            assert index.minimum_grade(nis, 'IPA', target, level) == 0
+
+
+@pytest.mark.parametrize('level', ['kelas', 'angkatan'])
+@pytest.mark.parametrize('target', [1, 2, 3, 6])
+def test_minimum_grades_matches_single_queries(df, level, target):
+    index = WhatIfIndex(df, SUBJECTS)
+    hasil = index.minimum_grades('IPS', target, level)
+    expected = [index.minimum_grade(nis, 'IPS', target, level) for nis in df['NIS']]
+    np.testing.assert_allclose(hasil['Nilai Minimal'], expected)
+    assert list(hasil['Bisa Dicapai']) == [n <= 100 for n in expected]
@@ -0,0 +1,221 @@
+import argparse
+import hashlib
+import io
+import json
+import os
+import secrets
+import time
+from datetime import datetime, timezone
+
+import joblib
+import numpy as np
+import pandas as pd
+from joblib import Parallel, delayed
+from sklearn.model_selection import KFold
+from sklearn.neighbors import KNeighborsRegressor, NearestNeighbors
+from sklearn.preprocessing import StandardScaler
+
+# Urutan fitur harus sama dengan yang dipakai di index.py
+SUBJECTS = ['PAB', 'B.Indonesia', 'B.Inggris', 'Informatika', 'IPA', 'IPS',
+            'Matematika', 'Mulok', 'Pancasila', 'PJOK', 'Prakarya', 'Seni']
+
+DATA_PATH = "data_siswa.csv"
+MODEL_DIR = "model"
+VERSIONS_DIR = os.path.join(MODEL_DIR, "versions")
+MANIFEST_NAME = "manifest.json"
+
+# Kandidat hyperparameter yang dicari lewat cross-validation
+# Grid dibuat cukup lebar; pada data saat ini minimum error ada di tengah grid
+# (sekitar k=21). Jika k terbaik jatuh di ujung grid, manifest menandainya.
+DEFAULT_K_VALUES = [3, 5, 7, 9, 11, 15, 21, 31, 41, 61]
+DEFAULT_METRICS = ['euclidean', 'manhattan', 'chebyshev', 'cosine']
+
+
+# Hitung hash file data supaya versi model bisa ditelusuri ke data sumbernya
+def hash_file(path):
+    sha = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            sha.update(chunk)
+    return sha.hexdigest()
+
+
+# Mengembalikan fitur beserta hash dari byte file yang benar-benar dibaca,
+# supaya hash di manifest selalu sesuai dengan data yang dilatih
+def load_training_data(path=DATA_PATH):
+    with open(path, "rb") as f:
+        raw = f.read()
+    data_sha256 = hashlib.sha256(raw).hexdigest()
+    df = pd.read_csv(io.BytesIO(raw))
+    # Sama seperti load_data di index.py: buang duplikat berdasarkan NIS
+    df = df.drop_duplicates(subset=["NIS"], keep="first")
+    missing = [s for s in SUBJECTS if s not in df.columns]
+    if missing:
+        raise ValueError(f"Kolom mata pelajaran tidak ditemukan: {missing}")
+    return df[SUBJECTS].dropna(), data_sha256
+
+
+# Skor satu fold: untuk setiap mata pelajaran, nilai siswa di fold validasi
+# ditebak dari rata-rata k tetangga terdekat berdasarkan 11 mata pelajaran
+# lainnya. Semakin kecil error, semakin "mirip" tetangga yang ditemukan.
+# NearestNeighbors tidak punya label, jadi proxy ini yang dipakai: k dan metrik
+# yang tetangganya paling baik menjelaskan nilai yang disembunyikan juga
+# menghasilkan kelompok tetangga yang paling mirip di ruang 12 mata pelajaran.
+# Menyembunyikan satu mata pelajaran menghindari kebocoran (nilai yang ditebak
+# tidak ikut dipakai mencari tetangga); selisih 11 vs 12 fitur hanya sedikit
+# mengubah jarak karena semua fitur sudah distandardisasi.
+def score_fold(X, train_idx, val_idx, k, metric):
+    scaler = StandardScaler().fit(X[train_idx])
+    X_train = scaler.transform(X[train_idx])
+    X_val = scaler.transform(X[val_idx])
+
+    errors = []
+    for j in range(X.shape[1]):
+        others = [c for c in range(X.shape[1]) if c != j]
+        reg = KNeighborsRegressor(n_neighbors=k, metric=metric, algorithm='brute')
+        reg.fit(X_train[:, others], X_train[:, j])
+        pred = reg.predict(X_val[:, others])
+        errors.append(np.mean((pred - X_val[:, j]) ** 2))
+    return float(np.mean(errors))
+
+
+def search_hyperparameters(X, k_values, metrics, n_splits=5, n_jobs=-1, random_state=42):
+    kfold = KFold(n_splits=n_splits, shuffle=True, random_state=random_state)
+    folds = list(kfold.split(X))
+    # k tidak boleh melebihi jumlah data latih terkecil di antara fold
+    max_k = min(len(train_idx) for train_idx, _ in folds)
+    candidates = [(k, m) for k in k_values if k <= max_k for m in metrics]
+    if not candidates:
+        raise ValueError("Tidak ada kandidat k yang valid untuk jumlah data ini.")
+
+    # Setiap kombinasi (k, metric, fold) dijalankan paralel di semua core
+    scores = Parallel(n_jobs=n_jobs)(
+        delayed(score_fold)(X, train_idx, val_idx, k, m)
+        for k, m in candidates
+        for train_idx, val_idx in folds
+    )
+
+    results = []
+    for i, (k, m) in enumerate(candidates):
+        fold_scores = scores[i * n_splits:(i + 1) * n_splits]
+        results.append({
+            'n_neighbors': k,
+            'metric': m,
+            'mean_mse': float(np.mean(fold_scores)),
+            'std_mse': float(np.std(fold_scores)),
+        })
+    results.sort(key=lambda r: r['mean_mse'])
+    return results
+
+
+def train(data_path=DATA_PATH, versions_dir=VERSIONS_DIR, k_values=None, metrics=None,
+          n_splits=5, n_jobs=-1):
+    k_values = k_values or DEFAULT_K_VALUES
+    metrics = metrics or DEFAULT_METRICS
+    timings = {}
+    t_start = time.perf_counter()
+
+    t0 = time.perf_counter()
+    df, data_sha256 = load_training_data(data_path)
+    X = df.to_numpy(dtype=float)
+    timings['load_seconds'] = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    results = search_hyperparameters(X, k_values, metrics, n_splits=n_splits, n_jobs=n_jobs)
+    best = results[0]
+    timings['search_seconds'] = time.perf_counter() - t0
+    # k terbaik di ujung grid berarti optimum mungkin ada di luar grid
+    tested_k = sorted({r['n_neighbors'] for r in results})
+    best_k_at_grid_edge = len(tested_k) > 1 and best['n_neighbors'] in (tested_k[0], tested_k[-1])
+
+    # Latih model akhir dengan seluruh data dan hyperparameter terbaik
+    t0 = time.perf_counter()
+    scaler = StandardScaler().fit(df)
+    knn = NearestNeighbors(n_neighbors=best['n_neighbors'], metric=best['metric'])
+    knn.fit(scaler.transform(df))
+    timings['fit_seconds'] = time.perf_counter() - t0
+
+    # Mikrodetik dan sufiks acak membuat nama versi unik walaupun dua proses
+    # berjalan di detik yang sama; urutan leksikografis tetap kronologis
+    version = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%S%fZ") + "-" + secrets.token_hex(3)
+    version_dir = os.path.join(versions_dir, version)
+    tmp_dir = version_dir + ".tmp"
+    os.makedirs(tmp_dir, exist_ok=False)
+
+    joblib.dump(knn, os.path.join(tmp_dir, "knn_model.pkl"))
+    joblib.dump(scaler, os.path.join(tmp_dir, "scaler.pkl"))
+    timings['total_seconds'] = time.perf_counter() - t_start
+
+    manifest = {
+        'version': version,
+        'created_at': datetime.now(timezone.utc).isoformat(),
+        'features': SUBJECTS,
+        'data_path': data_path,
+        'data_sha256': data_sha256,
+        'n_samples': int(len(df)),
+        'n_neighbors': best['n_neighbors'],
+        'metric': best['metric'],
+        'cv_splits': n_splits,
+        'cv_results': results,
+        'best_k_at_grid_edge': best_k_at_grid_edge,
+        'timings': timings,
+    }
+    with open(os.path.join(tmp_dir, MANIFEST_NAME), "w") as f:
+        json.dump(manifest, f, indent=2)
+
+    # Rename folder sekaligus supaya aplikasi tidak pernah membaca versi setengah jadi
+    os.replace(tmp_dir, version_dir)
+    return manifest
+
+
+# Cari versi model terbaru yang sudah lengkap (punya manifest)
+def latest_model_version(versions_dir=VERSIONS_DIR):
+    if not os.path.isdir(versions_dir):
+        return None
+    versions = sorted(
+        name for name in os.listdir(versions_dir)
+        if not name.endswith(".tmp")
+        and os.path.isfile(os.path.join(versions_dir, name, MANIFEST_NAME))
+    )
+    return versions[-1] if versions else None
+
+
+def load_manifest(version, versions_dir=VERSIONS_DIR):
+    with open(os.path.join(versions_dir, version, MANIFEST_NAME)) as f:
+        return json.load(f)
+
+
+# Muat knn, scaler dan urutan fitur untuk versi tertentu
+def load_artifacts(version, versions_dir=VERSIONS_DIR):
+    if version is None:
+        # Fallback ke artefak lama jika belum ada model berversi
+        return (joblib.load(os.path.join(MODEL_DIR, "knn_model.pkl")),
+                joblib.load(os.path.join(MODEL_DIR, "scaler.pkl")), SUBJECTS)
+    model_dir = os.path.join(versions_dir, version)
+    manifest = load_manifest(version, versions_dir)
+    knn = joblib.load(os.path.join(model_dir, "knn_model.pkl"))
+    scaler = joblib.load(os.path.join(model_dir, "scaler.pkl"))
+    return knn, scaler, manifest['features']
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Latih ulang model KNN dan scaler dari data nilai siswa.")
+    parser.add_argument("--data", default=DATA_PATH, help="Path file CSV nilai siswa")
+    parser.add_argument("--output", default=VERSIONS_DIR, help="Folder tujuan model berversi")
+    parser.add_argument("--k", type=int, nargs="+", default=DEFAULT_K_VALUES, help="Kandidat jumlah tetangga")
+    parser.add_argument("--metrics", nargs="+", default=DEFAULT_METRICS, help="Kandidat metrik jarak")
+    parser.add_argument("--cv", type=int, default=5, help="Jumlah fold cross-validation")
+    parser.add_argument("--jobs", type=int, default=-1, help="Jumlah proses paralel (-1 = semua core)")
+    args = parser.parse_args()
+
+    manifest = train(args.data, args.output, args.k, args.metrics, args.cv, args.jobs)
+    print(f"Model versi {manifest['version']} disimpan di {os.path.join(args.output, manifest['version'])}")
+    print(f"k={manifest['n_neighbors']}, metric={manifest['metric']}, "
+          f"mse={manifest['cv_results'][0]['mean_mse']:.4f}")
+    if manifest['best_k_at_grid_edge']:
+        print("Peringatan: k terbaik berada di ujung grid, coba perlebar pilihan --k.")
+    print(f"Waktu total: {manifest['timings']['total_seconds']:.2f} detik")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,131 @@
+import argparse
+
+import numpy as np
+import pandas as pd
+
+from train_model import SUBJECTS
+
+DATA_PATH = "data_siswa.csv"
+KKM = 65
+NILAI_MAKSIMAL = 100
+
+
+# Indeks untuk simulasi "what-if". Total nilai setiap kelas dan angkatan
+# disimpan sebagai array terurut, sehingga peringkat baru cukup dicari
+# dengan searchsorted (O(log n)) tanpa menyalin atau me-ranking DataFrame.
+class WhatIfIndex:
+    def __init__(self, df, subjects=SUBJECTS):
+        self.subjects = list(subjects)
+        self.nis = df['NIS'].to_numpy()
+        self.nama = df['Nama Siswa'].to_numpy()
+        self.kelas = df['Kelas'].to_numpy(dtype=str)
+        self.grades = df[self.subjects].to_numpy(dtype=float)
+        self.totals = self.grades.mean(axis=1)
+        self._row = {nis: i for i, nis in enumerate(self.nis)}
+        self._keys = {'kelas': self.kelas, 'angkatan': np.array([k[:-1] for k in self.kelas])}
+
+        # Aturan kelompok sama dengan calculate_rankings di ranking.py:
+        # angkatan = nama kelas tanpa huruf terakhir, anggota dicari dengan startswith
+        self.groups = {'kelas': {}, 'angkatan': {}}
+        for kelas in np.unique(self.kelas):
+            members = np.flatnonzero(self.kelas == kelas)
+            self.groups['kelas'][kelas] = (members, np.sort(self.totals[members]))
+        for angkatan in np.unique(self._keys['angkatan']):
+            members = np.flatnonzero(np.char.startswith(self.kelas, angkatan))
+            self.groups['angkatan'][angkatan] = (members, np.sort(self.totals[members]))
+
+    def _group_key(self, i, level):
+        return self._keys[level][i]
+
+    # Peringkat (method='min', descending) untuk total baru di antara siswa lain.
+    # Total lama siswa itu sendiri tidak ikut dihitung.
+    @staticmethod
+    def _rank(sorted_totals, own_total, new_total):
+        greater = len(sorted_totals) - np.searchsorted(sorted_totals, new_total, side='right')
+        if own_total > new_total:
+            greater -= 1
+        return int(greater) + 1
+
+    def simulate(self, nis, changes):
+        i = self._row[nis]
+        grades = dict(zip(self.subjects, self.grades[i]))
+        grades.update(changes)
+        # Total diperbarui dari selisih nilai yang diubah saja
+        delta = sum(grades[s] - self.grades[i][j] for j, s in enumerate(self.subjects) if s in changes)
+        total = self.totals[i] + delta / len(self.subjects)
+
+        result = {'total_nilai': float(total)}
+        for level in ('kelas', 'angkatan'):
+            _, sorted_totals = self.groups[level][self._group_key(i, level)]
+            peringkat = self._rank(sorted_totals, self.totals[i], total)
+            jumlah = len(sorted_totals)
+            result[f'peringkat_{level}'] = peringkat
+            result[f'total_{level}'] = jumlah
+            result[f'persentil_{level}'] = ((jumlah - peringkat + 1) / jumlah) * 100
+        result['belum_tuntas'] = [s for s in self.subjects if grades[s] < KKM]
+        return result
+
+    # Total minimal agar setiap anggota kelompok mencapai peringkat target,
+    # yaitu nilai tertinggi ke-N di antara siswa lain (-inf jika selalu tercapai)
+    @staticmethod
+    def _target_totals(sorted_totals, own_totals, target_rank):
+        n = len(sorted_totals)
+        if target_rank > n - 1:
+            return np.full(len(own_totals), -np.inf)
+        own_pos = np.searchsorted(sorted_totals, own_totals, side='left')
+        idx = np.where(own_pos <= n - 1 - target_rank, n - target_rank, n - 1 - target_rank)
+        return sorted_totals[idx]
+
+    def _needed_grades(self, rows, subject, target_totals):
+        j = self.subjects.index(subject)
+        needed = self.grades[rows, j] + (target_totals - self.totals[rows]) * len(self.subjects)
+        # Dibulatkan ke atas 2 desimal supaya total baru tidak kurang dari target
+        return np.clip(np.ceil(needed * 100) / 100, 0, None)
+
+    def minimum_grade(self, nis, subject, target_rank, level='kelas'):
+        i = self._row[nis]
+        _, sorted_totals = self.groups[level][self._group_key(i, level)]
+        target = self._target_totals(sorted_totals, self.totals[i:i + 1], target_rank)
+        return float(self._needed_grades(np.array([i]), subject, target)[0])
+
+    # Nilai minimal mata pelajaran `subject` untuk semua siswa sekaligus agar
+    # mencapai peringkat `target_rank` di kelas atau angkatannya
+    def minimum_grades(self, subject, target_rank, level='kelas'):
+        needed = np.empty(len(self.nis))
+        for key, (members, sorted_totals) in self.groups[level].items():
+            # Dengan startswith, kelompok 'VII' juga berisi siswa kelas VIII;
+            # hasil hanya diisi untuk siswa yang memang berada di kelompok ini
+            rows = members[self._keys[level][members] == key]
+            target = self._target_totals(sorted_totals, self.totals[rows], target_rank)
+            needed[rows] = self._needed_grades(rows, subject, target)
+        j = self.subjects.index(subject)
+        return pd.DataFrame({
+            'NIS': self.nis,
+            'Nama Siswa': self.nama,
+            'Kelas': self.kelas,
+            'Nilai Sekarang': self.grades[:, j],
+            'Nilai Minimal': needed,
+            'Kenaikan': np.clip(needed - self.grades[:, j], 0, None),
+            'Bisa Dicapai': needed <= NILAI_MAKSIMAL,
+        })
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Hitung nilai minimal mata pelajaran untuk mencapai peringkat tertentu.")
+    parser.add_argument("subject", choices=SUBJECTS, help="Mata pelajaran yang dinaikkan")
+    parser.add_argument("rank", type=int, help="Peringkat target")
+    parser.add_argument("--level", choices=['kelas', 'angkatan'], default='kelas')
+    parser.add_argument("--data", default=DATA_PATH, help="Path file CSV nilai siswa")
+    parser.add_argument("--output", help="Simpan hasil ke file CSV")
+    args = parser.parse_args()
+
+    df = pd.read_csv(args.data).drop_duplicates(subset=["NIS"], keep="first")
+    hasil = WhatIfIndex(df).minimum_grades(args.subject, args.rank, args.level)
+    if args.output:
+        hasil.to_csv(args.output, index=False)
+    else:
+        print(hasil.to_string(index=False))
+
+
+if __name__ == "__main__":
+    main()